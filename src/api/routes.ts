@@ -12,6 +12,7 @@ import {
 import { sendUnifiedRequest } from "@/utils/request";
 import { createApiError } from "./middleware";
 import { log } from "../utils/log";
+import { Transformer } from "@/types/transformer";
 
 export const registerApiRoutes: FastifyPluginAsync = async (
   fastify: FastifyInstance
@@ -28,6 +29,19 @@ export const registerApiRoutes: FastifyPluginAsync = async (
   const transformersWithEndpoint =
     fastify._server!.transformerService.getTransformersWithEndpoint();
 
+  // Resolve a transformer chain by name once, skipping unknown entries
+  const resolveTransformers = (names?: string[]): Transformer[] => {
+    const resolved: Transformer[] = [];
+    for (const transformerName of names || []) {
+      const transformer =
+        fastify._server!.transformerService.getTransformer(transformerName);
+      if (transformer) {
+        resolved.push(transformer);
+      }
+    }
+    return resolved;
+  };
+
   for (const { name, transformer } of transformersWithEndpoint) {
     if (transformer.endPoint) {
       fastify.post(
@@ -44,6 +58,14 @@ export const registerApiRoutes: FastifyPluginAsync = async (
               "provider_not_found"
             );
           }
+          // Provider-level and model-level chains are shared by the request
+          // and response phases, so look them up only once per request
+          const providerTransformers = resolveTransformers(
+            provider.transformer?.use
+          );
+          const modelTransformers = resolveTransformers(
+            provider.transformer?.[body.model]?.use
+          );
           let requestBody = body;
           let config = {};
           if (typeof transformer.transformRequestOut === "function") {
@@ -57,48 +79,29 @@ export const registerApiRoutes: FastifyPluginAsync = async (
               requestBody = transformOut;
             }
           }
-          if (provider.transformer?.use?.length) {
-            for (const transformerName of provider.transformer.use) {
-              const transformer =
-                fastify._server!.transformerService.getTransformer(
-                  transformerName
-                );
-              if (
-                !transformer ||
-                typeof transformer.transformRequestIn !== "function"
-              ) {
-                continue;
-              }
-              const transformIn = transformer.transformRequestIn(
-                requestBody,
-                provider
-              );
-              if (transformIn.body) {
-                requestBody = transformIn.body;
-                config = { ...config, ...transformIn.config };
-              } else {
-                requestBody = transformIn;
-              }
+          for (const transformer of providerTransformers) {
+            if (typeof transformer.transformRequestIn !== "function") {
+              continue;
+            }
+            const transformIn = transformer.transformRequestIn(
+              requestBody,
+              provider
+            );
+            if (transformIn.body) {
+              requestBody = transformIn.body;
+              config = { ...config, ...transformIn.config };
+            } else {
+              requestBody = transformIn;
             }
           }
-          if (provider.transformer?.[req.body.model]?.use?.length) {
-            for (const transformerName of provider.transformer[req.body.model]
-              .use) {
-              const transformer =
-                fastify._server!.transformerService.getTransformer(
-                  transformerName
-                );
-              if (
-                !transformer ||
-                typeof transformer.transformRequestIn !== "function"
-              ) {
-                continue;
-              }
-              requestBody = transformer.transformRequestIn(
-                requestBody,
-                provider
-              );
+          for (const transformer of modelTransformers) {
+            if (typeof transformer.transformRequestIn !== "function") {
+              continue;
             }
+            requestBody = transformer.transformRequestIn(
+              requestBody,
+              provider
+            );
           }
           const url = config.url || new URL(provider.baseUrl);
           const response = await sendUnifiedRequest(url, requestBody, {
@@ -119,40 +122,16 @@ export const registerApiRoutes: FastifyPluginAsync = async (
             );
           }
           let finalResponse = response;
-          if (provider.transformer?.use?.length) {
-            for (const transformerName of provider.transformer.use) {
-              const transformer =
-                fastify._server!.transformerService.getTransformer(
-                  transformerName
-                );
-              if (
-                !transformer ||
-                typeof transformer.transformResponseOut !== "function"
-              ) {
-                continue;
-              }
-              finalResponse = await transformer.transformResponseOut(
-                finalResponse
-              );
-            }
-          }
-          if (provider.transformer?.[req.body.model]?.use?.length) {
-            for (const transformerName of provider.transformer[req.body.model]
-              .use) {
-              const transformer =
-                fastify._server!.transformerService.getTransformer(
-                  transformerName
-                );
-              if (
-                !transformer ||
-                typeof transformer.transformResponseOut !== "function"
-              ) {
-                continue;
-              }
-              finalResponse = await transformer.transformResponseOut(
-                finalResponse
-              );
+          for (const transformer of [
+            ...providerTransformers,
+            ...modelTransformers,
+          ]) {
+            if (typeof transformer.transformResponseOut !== "function") {
+              continue;
             }
+            finalResponse = await transformer.transformResponseOut(
+              finalResponse
+            );
           }
           if (transformer.transformResponseIn) {
             finalResponse = await transformer.transformResponseIn(
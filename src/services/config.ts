@@ -70,17 +70,18 @@ export class ConfigService {
       ? this.options.jsonPath
       : join(projectRoot, this.options.jsonPath);
 
-    if (existsSync(jsonPath)) {
-      try {
-        const jsonContent = readFileSync(jsonPath, "utf-8");
-        const jsonConfig = JSON.parse(jsonContent);
-        this.config = { ...this.config, ...jsonConfig };
-        console.log(`Loaded JSON config from: ${jsonPath}`);
-      } catch (error) {
+    // A missing file (ENOENT) means there is no JSON config
+    try {
+      const jsonContent = readFileSync(jsonPath, "utf-8");
+      const jsonConfig = JSON.parse(jsonContent);
+      this.config = { ...this.config, ...jsonConfig };
+      console.log(`Loaded JSON config from: ${jsonPath}`);
+    } catch (error: any) {
+      if (error?.code === "ENOENT") {
+        console.warn(`JSON config file not found: ${jsonPath}`);
+      } else {
         console.warn(`Failed to load JSON config from ${jsonPath}:`, error);
       }
-    } else {
-      console.warn(`JSON config file not found: ${jsonPath}`);
     }
   }
 
@@ -155,13 +155,14 @@ export class RequestMergerService {
   private attemptMerge(requests: PendingRequest[]): MergedRequest | null {
     // 检查是否具有相同的系统提示词和基础配置
     const firstRequest = requests[0].request;
-    const baseSystemMessages = this.extractSystemMessages(firstRequest.messages);
+    // 每个请求只遍历一次消息，同时拆出系统消息和用户消息，供比较与合并复用
+    const partitions = requests.map(req => this.partitionMessages(req.request.messages));
+    const baseSystemMessages = partitions[0].systemMessages;
     
-    // 检查所有请求是否具有相同的系统提示词
-    const canMerge = requests.every(req => {
-      const systemMessages = this.extractSystemMessages(req.request.messages);
-      return this.messagesEqual(baseSystemMessages, systemMessages);
-    });
+    // 检查所有请求是否具有相同的系统提示词（第一个请求就是基准，无需与自身比较）
+    const canMerge = partitions.every(({ systemMessages }, i) =>
+      i === 0 || this.messagesEqual(baseSystemMessages, systemMessages)
+    );
 
     if (!canMerge) {
       return null;
@@ -171,8 +172,8 @@ export class RequestMergerService {
     const mergedMessages: UnifiedMessage[] = [...baseSystemMessages];
     const subRequests = [];
 
-    for (const request of requests) {
-      const userMessages = this.extractUserMessages(request.request.messages);
+    for (const [i, request] of requests.entries()) {
+      const { userMessages } = partitions[i];
       const startIndex = mergedMessages.length;
       
       // 添加分隔符
@@ -338,17 +339,22 @@ export class RequestMergerService {
   }
 
   /**
-   * 提取系统消息
-   */
-  private extractSystemMessages(messages: UnifiedMessage[]): UnifiedMessage[] {
-    return messages.filter(msg => msg.role === "system");
-  }
-
-  /**
-   * 提取用户消息
+   * 单次遍历拆分系统消息与用户消息（非system角色）
    */
-  private extractUserMessages(messages: UnifiedMessage[]): UnifiedMessage[] {
-    return messages.filter(msg => msg.role !== "system");
+  private partitionMessages(messages: UnifiedMessage[]): {
+    systemMessages: UnifiedMessage[];
+    userMessages: UnifiedMessage[];
+  } {
+    const systemMessages: UnifiedMessage[] = [];
+    const userMessages: UnifiedMessage[] = [];
+    for (const msg of messages) {
+      if (msg.role === "system") {
+        systemMessages.push(msg);
+      } else {
+        userMessages.push(msg);
+      }
+    }
+    return { systemMessages, userMessages };
   }
 
   /**
@@ -374,20 +380,28 @@ export class RequestMergerService {
    */
   private splitMergedResponse(fullContent: string, subRequests: any[]): string[] {
     const responses: string[] = [];
+    // 子响应通常按请求顺序出现，从上一个结束分隔符之后继续查找，整体只扫描一遍内容
+    let cursor = 0;
     
     for (const subRequest of subRequests) {
       const startMarker = `--- 请求 ${subRequest.id} 开始 ---`;
       const endMarker = `--- 请求 ${subRequest.id} 结束 ---`;
       
-      const startIndex = fullContent.indexOf(startMarker);
-      const endIndex = fullContent.indexOf(endMarker);
+      let startIndex = fullContent.indexOf(startMarker, cursor);
+      if (startIndex === -1) {
+        // 顺序被打乱时退回到从头查找
+        startIndex = fullContent.indexOf(startMarker);
+      }
+      const contentStart = startIndex + startMarker.length;
+      const endIndex = startIndex !== -1 ? fullContent.indexOf(endMarker, contentStart) : -1;
       
       if (startIndex !== -1 && endIndex !== -1) {
         const responseContent = fullContent.substring(
-          startIndex + startMarker.length,
+          contentStart,
           endIndex
         ).trim();
         responses.push(responseContent);
+        cursor = endIndex + endMarker.length;
       } else {
         responses.push(""); // 如果找不到分隔符，返回空响应
       }
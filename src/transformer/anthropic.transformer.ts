@@ -3,6 +3,32 @@ import { UnifiedChatRequest, UnifiedMessage, UnifiedTool } from "@/types/llm";
 import { Transformer } from "@/types/transformer";
 import { log } from "@/utils/log";
 
+const encoder = new TextEncoder();
+
+// 需要特别监控的背景模型
+const BACKGROUND_MODEL = "gemini-2.5-flash-lite-preview-06-17";
+
+// 工具参数兜底转义：单次扫描同时去除控制字符并转义反斜杠和双引号
+const ARGUMENT_ESCAPE_PATTERN = /[\x00-\x1F\x7F-\x9F\\"]/g;
+
+function escapeArgumentChar(char: string): string {
+  if (char === "\\") return "\\\\";
+  if (char === '"') return '\\"';
+  return "";
+}
+
+// OpenAI finish_reason → Anthropic stop_reason，流式与非流式响应共用
+const STOP_REASON_MAPPING: Record<string, string> = {
+  stop: "end_turn",
+  length: "max_tokens",
+  tool_calls: "tool_use",
+  content_filter: "stop_sequence",
+};
+
+function toAnthropicStopReason(finishReason: string | null | undefined): string {
+  return (finishReason && STOP_REASON_MAPPING[finishReason]) || "end_turn";
+}
+
 export class AnthropicTransformer implements Transformer {
   name = "Anthropic";
   endPoint = "/v1/messages";
@@ -10,7 +36,7 @@ export class AnthropicTransformer implements Transformer {
   transformRequestOut(request: Record<string, any>): UnifiedChatRequest {
     log(`🚀 [MODEL_ROUTING] Anthropic Request - Model: ${request.model}, Messages: ${request.messages?.length || 0}`);
     // 检查是否是背景模型
-    if (request.model?.includes("gemini-2.5-flash-lite-preview-06-17")) {
+    if (request.model?.includes(BACKGROUND_MODEL)) {
       log(`✅ [BACKGROUND_MODEL] 检测到背景模型: ${request.model}`);
     } else {
       log(`🟡 [OTHER_MODEL] 其他模型: ${request.model}`);
@@ -43,9 +69,10 @@ export class AnthropicTransformer implements Transformer {
       }
     }
 
-    const requestMessages = JSON.parse(JSON.stringify(request.messages || []));
+    // 只读取原始消息并构造新的消息对象，不会修改入参
+    const requestMessages = request.messages || [];
 
-    requestMessages?.forEach((msg: any, index: number) => {
+    requestMessages.forEach((msg: any, index: number) => {
       if (msg.role === "user" || msg.role === "assistant") {
         if (typeof msg.content === "string") {
           messages.push({
@@ -57,33 +84,30 @@ export class AnthropicTransformer implements Transformer {
             }],
           });
         } else if (Array.isArray(msg.content)) {
+          // 单次遍历 content：工具结果 / 文本 / 工具调用边遍历边转换
           if (msg.role === "user") {
-            const toolParts = msg.content.filter(
-              (c: any) => c.type === "tool_result" && c.tool_use_id
-            );
-            if (toolParts.length) {
-              toolParts.forEach((tool: any, toolIndex: number) => {
+            const textParts: any[] = [];
+            for (const c of msg.content) {
+              if (c.type === "tool_result" && c.tool_use_id) {
                 const toolMessage: UnifiedMessage = {
                   role: "tool",
-                  name: tool.name || tool.tool_use_id || "unknown",
+                  name: c.name || c.tool_use_id || "unknown",
                   content:
-                    typeof tool.content === "string"
-                      ? tool.content
-                      : JSON.stringify(tool.content),
-                  tool_call_id: tool.tool_use_id,
-                  cache_control: tool.cache_control,
+                    typeof c.content === "string"
+                      ? c.content
+                      : JSON.stringify(c.content),
+                  tool_call_id: c.tool_use_id,
+                  cache_control: c.cache_control,
                 };
                 messages.push(toolMessage);
-              });
+              } else if (c.type === "text" && c.text) {
+                textParts.push({
+                  type: "text",
+                  text: c.text,
+                  cache_control: { type: "ephemeral" }
+                });
+              }
             }
-
-            const textParts = msg.content.filter(
-              (c: any) => c.type === "text" && c.text
-            ).map((c: any) => ({
-              type: "text",
-              text: c.text,
-              cache_control: { type: "ephemeral" }
-            }));
             if (textParts.length) {
               messages.push({
                 role: "user",
@@ -91,39 +115,29 @@ export class AnthropicTransformer implements Transformer {
               });
             }
           } else if (msg.role === "assistant") {
-            const textParts = msg.content.filter(
-              (c: any) => c.type === "text" && c.text
-            ).map((c: any) => ({
-              type: "text",
-              text: c.text,
-              cache_control: { type: "ephemeral" }
-            }));
-            if (textParts.length) {
-              messages.push(
-                ...textParts.map((text: any) => ({
+            const toolCalls: any[] = [];
+            for (const c of msg.content) {
+              if (c.type === "text" && c.text) {
+                messages.push({
                   role: "assistant",
-                  content: text.text,
-                }))
-              );
+                  content: c.text,
+                });
+              } else if (c.type === "tool_use" && c.id) {
+                toolCalls.push({
+                  id: c.id,
+                  type: "function" as const,
+                  function: {
+                    name: c.name,
+                    arguments: JSON.stringify(c.input || {}),
+                  },
+                });
+              }
             }
-
-            const toolCallParts = msg.content.filter(
-              (c: any) => c.type === "tool_use" && c.id
-            );
-            if (toolCallParts.length) {
+            if (toolCalls.length) {
               messages.push({
                 role: "assistant" as const,
                 content: null,
-                tool_calls: toolCallParts.map((tool: any) => {
-                  return {
-                    id: tool.id,
-                    type: "function" as const,
-                    function: {
-                      name: tool.name,
-                      arguments: JSON.stringify(tool.input || {}),
-                    },
-                  };
-                }),
+                tool_calls: toolCalls,
               });
             }
           }
@@ -147,12 +161,11 @@ export class AnthropicTransformer implements Transformer {
   }
 
   async transformResponseIn(response: Response): Promise<Response> {
-    const isStream = response.headers
-      .get("Content-Type")
-      ?.includes("text/event-stream");
+    const contentType = response.headers.get("Content-Type");
+    const isStream = contentType?.includes("text/event-stream");
     
     log(`📡 [RESPONSE_TYPE] 响应类型: ${isStream ? '流式' : '非流式'}`);
-    log(`📡 [RESPONSE_HEADERS] 响应头: Content-Type=${response.headers.get('Content-Type')}`);
+    log(`📡 [RESPONSE_HEADERS] 响应头: Content-Type=${contentType}`);
     
     if (isStream) {
       if (!response.body) {
@@ -194,9 +207,9 @@ export class AnthropicTransformer implements Transformer {
   ): Promise<ReadableStream> {
     const readable = new ReadableStream({
       async start(controller) {
-        const encoder = new TextEncoder();
         const messageId = `msg_${Date.now()}`;
         let model = "unknown";
+        let isBackgroundModel = false;
         let hasStarted = false;
         let hasTextContentStarted = false;
         let hasFinished = false;
@@ -301,16 +314,21 @@ export class AnthropicTransformer implements Transformer {
                 if (totalChunks === 1) {
                   log(`📊 [FIRST_CHUNK] 模型: ${chunk.model || 'unknown'}, ID: ${chunk.id || 'unknown'}`);
                   // 特别标记背景模型
-                  if (chunk.model?.includes("gemini-2.5-flash-lite-preview-06-17")) {
+                  if (chunk.model?.includes(BACKGROUND_MODEL)) {
                     log(`🎯 [BACKGROUND_STREAM_START] 背景模型流式响应开始`);
                   }
                 }
 
+                const previousModel = model;
                 model = chunk.model || model;
+                // 仅在模型变化时重新判断是否为背景模型，避免每处日志都做一次子串查找
+                if (model !== previousModel) {
+                  isBackgroundModel = model.includes(BACKGROUND_MODEL);
+                }
                 // 监控响应中的模型信息
                 if (chunk.model && chunk.model !== model) {
                   log(`🔄 [MODEL_RESPONSE] 响应模型: ${chunk.model}`);
-                  if (chunk.model.includes("gemini-2.5-flash-lite-preview-06-17")) {
+                  if (chunk.model.includes(BACKGROUND_MODEL)) {
                     log(`✅ [BACKGROUND_MODEL_RESPONSE] 背景模型响应确认: ${chunk.model}`);
                   }
                 }
@@ -344,7 +362,7 @@ export class AnthropicTransformer implements Transformer {
                 const choice = chunk.choices?.[0];
                 if (!choice) {
                   // 监控背景模型的空选择
-                  if (model?.includes("gemini-2.5-flash-lite-preview-06-17")) {
+                  if (isBackgroundModel) {
                     log(`⚠️ [BACKGROUND_NO_CHOICE] 背景模型响应没有选择: ${JSON.stringify(chunk).substring(0, 200)}...`);
                   }
                   continue;
@@ -547,33 +565,10 @@ export class AnthropicTransformer implements Transformer {
                       }
                       const currentToolCall = toolCalls.get(toolCallIndex);
                       if (currentToolCall) {
+                        // 只累积参数片段，完整性校验在流结束时统一做一次，
+                        // 避免每个片段都重新解析整段已累积的参数
                         currentToolCall.arguments +=
                           toolCall.function.arguments;
-                        try {
-                          const trimmedArgs = currentToolCall.arguments.trim();
-                          if (
-                            trimmedArgs.startsWith("{") &&
-                            trimmedArgs.endsWith("}")
-                          ) {
-                            try {
-                              JSON.parse(trimmedArgs);
-                            } catch (e: any) {
-                              log(
-                                "Tool call index:",
-                                toolCallIndex,
-                                "error",
-                                e.message
-                              );
-                            }
-                          }
-                        } catch (e: any) {
-                          log(
-                            "Tool call index:",
-                            toolCallIndex,
-                            "error",
-                            e.message
-                          );
-                        }
                       }
 
                       try {
@@ -594,10 +589,10 @@ export class AnthropicTransformer implements Transformer {
                         );
                       } catch (error) {
                         try {
-                          const fixedArgument = toolCall.function.arguments
-                            .replace(/[\x00-\x1F\x7F-\x9F]/g, "")
-                            .replace(/\\/g, "\\\\")
-                            .replace(/"/g, '\\"');
+                          const fixedArgument = toolCall.function.arguments.replace(
+                            ARGUMENT_ESCAPE_PATTERN,
+                            escapeArgumentChar
+                          );
 
                           const fixedChunk = {
                             type: "content_block_delta",
@@ -626,14 +621,14 @@ export class AnthropicTransformer implements Transformer {
                   hasFinished = true;
                   
                   // 监控背景模型的完成原因
-                  if (model?.includes("gemini-2.5-flash-lite-preview-06-17")) {
+                  if (isBackgroundModel) {
                     log(`🎯 [BACKGROUND_FINISH_REASON] 背景模型完成原因: ${choice.finish_reason}`);
                   }
                   
                   // 流式响应结束统计
                   log(`🏁 [STREAM_END] 总块数: ${totalChunks}, 内容块: ${contentChunks}, 工具块: ${toolCallChunks}, 模型: ${model}`);
                   // 特别标记背景模型结束
-                  if (model?.includes("gemini-2.5-flash-lite-preview-06-17")) {
+                  if (isBackgroundModel) {
                     log(`🎯 [BACKGROUND_STREAM_END] 背景模型流式响应结束`);
                   }
                   
@@ -659,20 +654,10 @@ export class AnthropicTransformer implements Transformer {
                   }
 
                   if (!isClosed) {
-                    const stopReasonMapping = {
-                      stop: "end_turn",
-                      length: "max_tokens",
-                      tool_calls: "tool_use",
-                      content_filter: "stop_sequence",
-                    };
-
-                    const anthropicStopReason =
-                      stopReasonMapping[choice.finish_reason as keyof typeof stopReasonMapping] || "end_turn";
-
                     const messageDelta = {
                       type: "message_delta",
                       delta: {
-                        stop_reason: anthropicStopReason,
+                        stop_reason: toAnthropicStopReason(choice.finish_reason),
                         stop_sequence: null,
                       },
                       usage: final_usage,
@@ -704,10 +689,7 @@ export class AnthropicTransformer implements Transformer {
                     type: "message",
                     role: "assistant",
                     content: [],
-                    stop_reason: choice.finish_reason === "stop" ? "end_turn" : 
-                                choice.finish_reason === "length" ? "max_tokens" :
-                                choice.finish_reason === "tool_calls" ? "tool_use" :
-                                choice.finish_reason === "content_filter" ? "stop_sequence" : "end_turn",
+                    stop_reason: toAnthropicStopReason(choice.finish_reason),
                     stop_sequence: null,
                     usage: final_usage,
                   };
@@ -722,19 +704,32 @@ export class AnthropicTransformer implements Transformer {
 
                   // 收集工具调用
                   if (toolCallChunks > 0) {
-                    toolCalls.forEach((toolCall) => {
+                    toolCalls.forEach((toolCall, toolCallIndex) => {
+                      let input = {};
+                      if (toolCall.arguments) {
+                        try {
+                          input = JSON.parse(toolCall.arguments);
+                        } catch (e: any) {
+                          log(
+                            "Tool call index:",
+                            toolCallIndex,
+                            "error",
+                            e.message
+                          );
+                        }
+                      }
                       finalResponse.content.push({
                         type: "tool_use",
                         id: toolCall.id,
                         name: toolCall.name,
-                        input: toolCall.arguments ? JSON.parse(toolCall.arguments) : {}
+                        input,
                       });
                     });
                   }
 
                   log(`🎯 [FINAL_RESPONSE] Conversion complete, final Anthropic response: ${JSON.stringify(finalResponse, null, 2)}`);
                   // 特别标记背景模型最终响应
-                  if (model?.includes("gemini-2.5-flash-lite-preview-06-17")) {
+                  if (isBackgroundModel) {
                     log(`🎯 [BACKGROUND_FINAL_RESPONSE] 背景模型最终响应完成`);
                   }
 
@@ -742,7 +737,7 @@ export class AnthropicTransformer implements Transformer {
                 }
               } catch (parseError: any) {
                 // 特别标记背景模型的解析错误
-                if (model?.includes("gemini-2.5-flash-lite-preview-06-17")) {
+                if (isBackgroundModel) {
                   log(`❌ [BACKGROUND_PARSE_ERROR] 背景模型响应解析错误: ${parseError.message}`);
                   log(`❌ [BACKGROUND_PARSE_ERROR] 问题数据: ${data.substring(0, 200)}...`);
                 } else {
@@ -753,7 +748,7 @@ export class AnthropicTransformer implements Transformer {
           }
           
           // 监控背景模型的流式响应结束
-          if (model?.includes("gemini-2.5-flash-lite-preview-06-17")) {
+          if (isBackgroundModel) {
             log(`🏁 [BACKGROUND_STREAM_LOOP_END] 背景模型流式响应主循环结束，总块数: ${totalChunks}`);
           }
           
@@ -762,7 +757,7 @@ export class AnthropicTransformer implements Transformer {
           if (!isClosed) {
             try {
               // 特别标记背景模型的错误
-              if (model?.includes("gemini-2.5-flash-lite-preview-06-17")) {
+              if (isBackgroundModel) {
                 log(`❌ [BACKGROUND_STREAM_ERROR] 背景模型流式响应错误: ${(error as Error).message}`);
               }
               controller.error(error);
@@ -836,16 +831,7 @@ export class AnthropicTransformer implements Transformer {
       role: "assistant",
       model: openaiResponse.model,
       content: content,
-      stop_reason:
-        choice.finish_reason === "stop"
-          ? "end_turn"
-          : choice.finish_reason === "length"
-            ? "max_tokens"
-            : choice.finish_reason === "tool_calls"
-              ? "tool_use"
-              : choice.finish_reason === "content_filter"
-                ? "stop_sequence"
-                : "end_turn",
+      stop_reason: toAnthropicStopReason(choice.finish_reason),
       stop_sequence: null,
       usage: {
         input_tokens: openaiResponse.usage?.prompt_tokens || 0,
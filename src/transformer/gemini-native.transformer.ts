@@ -2,6 +2,8 @@ import { LLMProvider, UnifiedChatRequest } from "../types/llm";
 import { Transformer } from "../types/transformer";
 import { log } from "../utils/log";
 
+const encoder = new TextEncoder();
+
 // 版本号
 const GEMINI_NATIVE_VERSION = "v1.0";
 
@@ -20,6 +22,13 @@ const LOG_MARKERS = {
   DEBUG: `${LOG_PREFIX} 🔍 [调试]`,
 };
 
+// 统一格式的 tool_choice 到 Gemini function_calling_config.mode 的映射
+const TOOL_CHOICE_MODES = new Map<string, string>([
+  ['auto', 'AUTO'],
+  ['any', 'ANY'],
+  ['none', 'NONE'],
+]);
+
 /**
  * GeminiNativeTransformer
  *
@@ -65,8 +74,9 @@ export class GeminiNativeTransformer implements Transformer {
 
       // 设置 tool_config
       if (request.tool_choice) {
-        if (typeof request.tool_choice === 'string' && ['auto', 'any', 'none'].includes(request.tool_choice)) {
-          geminiRequest.tool_config = { function_calling_config: { mode: request.tool_choice.toUpperCase() } };
+        const mode = typeof request.tool_choice === 'string' ? TOOL_CHOICE_MODES.get(request.tool_choice) : undefined;
+        if (mode) {
+          geminiRequest.tool_config = { function_calling_config: { mode } };
         } else if (typeof request.tool_choice === 'object' && request.tool_choice.type === 'tool') {
           geminiRequest.tool_config = {
             function_calling_config: {
@@ -111,11 +121,14 @@ export class GeminiNativeTransformer implements Transformer {
         });
     }
 
+    // 响应体只读取一次，解析失败时日志使用同一份文本
+    let responseText = '';
     try {
-        const geminiJson = await response.json();
+        responseText = await response.text();
         if (process.env.GEMINI_LOG_RAW_RES === 'true') {
-            log(`${LOG_MARKERS.DEBUG} 原始 Gemini 响应: ${JSON.stringify(geminiJson, null, 2)}`);
+            log(`${LOG_MARKERS.DEBUG} 原始 Gemini 响应: ${responseText}`);
         }
+        const geminiJson = JSON.parse(responseText);
         const unifiedJson = this.convertGeminiChunkToUnified(geminiJson, "NON_STREAM");
         log(`${LOG_MARKERS.RES_TRANSFORM} 非流式响应转换完成`);
         return new Response(JSON.stringify(unifiedJson), {
@@ -124,8 +137,7 @@ export class GeminiNativeTransformer implements Transformer {
         });
     } catch (e: any) {
         log(`${LOG_MARKERS.ERROR} 解析非流式响应失败: ${e.message}`);
-        const responseText = await response.text(); // 尝试读取原始文本
-        log(`${LOG_MARKERS.ERROR} 原始响应文本: ${responseText}`);
+        log(`${LOG_MARKERS.ERROR} 原始响应文本(${responseText.length} 字符): ${responseText.substring(0, 200)}${responseText.length > 200 ? '...' : ''}`);
         return new Response(JSON.stringify({ 
             error: `Failed to parse non-streaming response: ${e.message}`,
             original_response: responseText
@@ -162,6 +174,9 @@ export class GeminiNativeTransformer implements Transformer {
         log(`${LOG_MARKERS.DEBUG} 提取到系统提示内容，将合并到首个用户消息中。`);
     }
 
+    // 第一条用户消息的位置
+    const firstUserIndex = otherMessages.findIndex(m => m.role === 'user');
+
     // 2. 处理剩余的消息
     otherMessages.forEach((msg, index) => {
         let role: string;
@@ -173,7 +188,7 @@ export class GeminiNativeTransformer implements Transformer {
             let userContent = '';
             
             // 查找这是不是处理列表中的第一条用户消息
-            if (otherMessages.findIndex(m => m.role === 'user') === index) {
+            if (firstUserIndex === index) {
                 isFirstUserMessage = true;
             }
 
@@ -251,7 +266,6 @@ export class GeminiNativeTransformer implements Transformer {
   // 辅助方法：创建统一格式的流
   private createUnifiedStream(responseBody: ReadableStream<Uint8Array>): ReadableStream<Uint8Array> {
     const decoder = new TextDecoder();
-    const encoder = new TextEncoder();
     let buffer = '';
 
     return new ReadableStream({
@@ -402,12 +416,21 @@ export class GeminiNativeTransformer implements Transformer {
 }
 
 // 递归删除 $schema 和 additionalProperties 字段
+// 用显式栈遍历，避免深层嵌套 schema 的递归调用和每层 Object.values 数组分配
 function removeSchema(obj: any) {
-  if (Array.isArray(obj)) {
-    obj.forEach(removeSchema);
-  } else if (obj && typeof obj === 'object') {
-    delete obj.$schema;
-    delete obj.additionalProperties;
-    Object.values(obj).forEach(removeSchema);
+  const stack: any[] = [obj];
+  while (stack.length > 0) {
+    const current = stack.pop();
+    if (!current || typeof current !== 'object') continue;
+    if (!Array.isArray(current)) {
+      delete current.$schema;
+      delete current.additionalProperties;
+    }
+    for (const key in current) {
+      const value = current[key];
+      if (value && typeof value === 'object') {
+        stack.push(value);
+      }
+    }
   }
 }
@@ -2,6 +2,8 @@ import { log } from "../utils/log";
 import { LLMProvider, UnifiedChatRequest, UnifiedMessage, UnifiedTool } from "../types/llm";
 import { Transformer } from "../types/transformer";
 
+const encoder = new TextEncoder();
+
 // Gemini API 类型定义
 interface GeminiPart {
   text?: string;
@@ -152,8 +154,10 @@ export class GeminiProTransformer implements Transformer {
                   }
                 }
                 
+                // 记录工具名和参数统计
                 const paramCount = cleanedTool.parameters ? Object.keys(cleanedTool.parameters.properties || {}).length : 0;
-                log(`🔧 [GEMINI_TOOL_DEF] 工具定义: ${cleanedTool.name}, 参数数量: ${paramCount}, 格式: ${JSON.stringify(cleanedTool).substring(0, 200)}...`);
+                const requiredCount = cleanedTool.parameters?.required?.length || 0;
+                log(`🔧 [GEMINI_TOOL_DEF] 工具定义: ${cleanedTool.name}, 参数数量: ${paramCount}, 必填参数: ${requiredCount}`);
                 
                 return cleanedTool;
               }) || [],
@@ -250,9 +254,10 @@ export class GeminiProTransformer implements Transformer {
   }
 
   async transformResponseOut(response: Response): Promise<Response> {
-    if (response.headers.get("Content-Type")?.includes("application/json")) {
+    const contentType = response.headers.get("Content-Type");
+    if (contentType?.includes("application/json")) {
       return this.handleNonStreamResponse(response);
-    } else if (response.headers.get("Content-Type")?.includes("stream")) {
+    } else if (contentType?.includes("stream")) {
       return this.handleStreamResponse(response);
     }
     return response;
@@ -267,10 +272,10 @@ export class GeminiProTransformer implements Transformer {
       throw new Error(`Gemini API error: ${response.status} ${response.statusText} - ${errorText}`);
     }
     
-    // 记录原始响应内容
-    const responseClone = response.clone();
-    const rawResponseText = await responseClone.text();
-    log(`🔍 [GEMINI_RAW_RESPONSE] 服务器原始响应: ${rawResponseText}`);
+    // 读取并记录原始响应内容
+    const rawResponseText = await response.text();
+    // 只记录前 200 个字符和总长度，避免整段响应（可能很大）写入日志
+    log(`🔍 [GEMINI_RAW_RESPONSE] 服务器原始响应(${rawResponseText.length} 字符): ${rawResponseText.substring(0, 200)}${rawResponseText.length > 200 ? '...' : ''}`);
     
     const jsonResponse: any = JSON.parse(rawResponseText);
     
@@ -386,12 +391,13 @@ export class GeminiProTransformer implements Transformer {
     }
 
     const decoder = new TextDecoder();
-    const encoder = new TextEncoder();
     const stream = new ReadableStream({
       async start(controller) {
         const reader = response.body!.getReader();
         let buffer = ""; // 引入缓冲区
         let usageMetadata: any = null;
+        // 同一个流的所有块共享同一个 created 时间戳（与 OpenAI 流式格式一致），只需计算一次
+        const created = Math.floor(Date.now() / 1000);
 
         try {
           while (true) {
@@ -416,7 +422,7 @@ export class GeminiProTransformer implements Transformer {
                     logprobs: null,
                   },
                 ],
-                created: parseInt(new Date().getTime() / 1000 + "", 10),
+                created,
                 id: "final",
                 model: "gemini-pro",
                 object: "chat.completion.chunk",
@@ -443,11 +449,13 @@ export class GeminiProTransformer implements Transformer {
             // 将新读取的数据追加到缓冲区
             buffer += decoder.decode(value, { stream: true });
 
-            // 处理缓冲区中所有完整的消息
+            // 处理缓冲区中所有完整的消息：用游标前进，循环结束后再一次性移除已处理部分，
+            // 避免每条消息都复制一遍剩余缓冲区
+            let cursor = 0;
             let boundary;
-            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
-              const messageString = buffer.slice(0, boundary);
-              buffer = buffer.slice(boundary + 2); // 从缓冲区移除已处理的消息
+            while ((boundary = buffer.indexOf('\n\n', cursor)) !== -1) {
+              const messageString = buffer.slice(cursor, boundary);
+              cursor = boundary + 2;
 
               if (!messageString.startsWith("data: ")) {
                 continue;
@@ -486,7 +494,7 @@ export class GeminiProTransformer implements Transformer {
                       logprobs: null,
                     },
                   ],
-                  created: parseInt(new Date().getTime() / 1000 + "", 10),
+                  created,
                   id: "",
                   model: "",
                   object: "chat.completion.chunk",
@@ -566,7 +574,7 @@ export class GeminiProTransformer implements Transformer {
                     logprobs: null,
                   },
                 ],
-                created: parseInt(new Date().getTime() / 1000 + "", 10),
+                created,
                 id: (chunk as any).responseId || "",
                 model: (chunk as any).modelVersion || "",
                 object: "chat.completion.chunk",
@@ -585,6 +593,7 @@ export class GeminiProTransformer implements Transformer {
                 encoder.encode(`data: ${JSON.stringify(res)}\n\n`)
               );
             }
+            buffer = buffer.slice(cursor); // 从缓冲区移除已处理的消息
           }
         } catch (error) {
           log(`❌ [GEMINI_STREAM_ERROR] 流处理错误: ${error}`);
@@ -602,7 +611,7 @@ export class GeminiProTransformer implements Transformer {
                   logprobs: null,
                 },
               ],
-              created: parseInt(new Date().getTime() / 1000 + "", 10),
+              created,
               id: "",
               model: "",
               object: "chat.completion.chunk",
@@ -3,6 +3,9 @@ import { LLMProvider, UnifiedChatRequest, UnifiedMessage } from "../types/llm";
 import { Transformer } from "../types/transformer";
 import { Content, ContentListUnion, Part, ToolListUnion } from "@google/genai";
 
+// TextEncoder 无状态，可以在所有流之间共享（TextDecoder 带流式状态，仍按流创建）
+const encoder = new TextEncoder();
+
 export class GeminiTransformer implements Transformer {
   name = "gemini";
 
@@ -15,14 +18,9 @@ export class GeminiTransformer implements Transformer {
     return {
       body: {
         contents: request.messages.map((message: UnifiedMessage) => {
-          let role: "user" | "model";
-          if (message.role === "assistant") {
-            role = "model";
-          } else if (["user", "system", "tool"].includes(message.role)) {
-            role = "user";
-          } else {
-            role = "user"; // Default to user if role is not recognized
-          }
+          // user/system/tool and unrecognized roles all map to "user"
+          const role: "user" | "model" =
+            message.role === "assistant" ? "model" : "user";
           const parts = [];
           if (typeof message.content === "string") {
             parts.push({
@@ -64,40 +62,29 @@ export class GeminiTransformer implements Transformer {
           {
             functionDeclarations:
               request.tools?.map((tool) => {
-                delete tool.function.parameters?.$schema;
-                delete tool.function.parameters?.additionalProperties;
-                if (tool.function.parameters?.properties) {
-                  Object.keys(tool.function.parameters.properties).forEach(
-                    (key) => {
-                      delete tool.function.parameters.properties[key].$schema;
-                      delete tool.function.parameters.properties[key]
-                        .additionalProperties;
-                      if (
-                        tool.function.parameters.properties[key].items &&
-                        typeof tool.function.parameters.properties[key]
-                          .items === "object"
-                      ) {
-                        delete tool.function.parameters.properties[key].items
-                          .$schema;
-                        delete tool.function.parameters.properties[key].items
-                          .additionalProperties;
-                      }
+                const parameters = tool.function.parameters;
+                delete parameters?.$schema;
+                delete parameters?.additionalProperties;
+                if (parameters?.properties) {
+                  for (const property of Object.values<any>(
+                    parameters.properties
+                  )) {
+                    delete property.$schema;
+                    delete property.additionalProperties;
+                    const items = property.items;
+                    if (items && typeof items === "object") {
+                      delete items.$schema;
+                      delete items.additionalProperties;
+                    }
 
-                      if (
-                        tool.function.parameters.properties[key].type ===
-                        "string"
-                      ) {
-                        if (
-                          !["enum", "date-time"].includes(
-                            tool.function.parameters.properties[key].format
-                          )
-                        ) {
-                          delete tool.function.parameters.properties[key]
-                            .format;
-                        }
-                      }
+                    if (
+                      property.type === "string" &&
+                      property.format !== "enum" &&
+                      property.format !== "date-time"
+                    ) {
+                      delete property.format;
                     }
-                  );
+                  }
                 }
                 return {
                   name: tool.function.name,
@@ -219,7 +206,8 @@ export class GeminiTransformer implements Transformer {
   // }
 
   async transformResponseOut(response: Response): Promise<Response> {
-    if (response.headers.get("Content-Type")?.includes("application/json")) {
+    const contentType = response.headers.get("Content-Type");
+    if (contentType?.includes("application/json")) {
       const jsonResponse: any = await response.json();
       const tool_calls = jsonResponse.candidates[0].content.parts
         .filter((part: Part) => part.functionCall)
@@ -266,13 +254,12 @@ export class GeminiTransformer implements Transformer {
         statusText: response.statusText,
         headers: response.headers,
       });
-    } else if (response.headers.get("Content-Type")?.includes("stream")) {
+    } else if (contentType?.includes("stream")) {
       if (!response.body) {
         return response;
       }
 
       const decoder = new TextDecoder();
-      const encoder = new TextEncoder();
       const stream = new ReadableStream({
         async start(controller) {
           const reader = response.body!.getReader();
@@ -4,6 +4,8 @@ import { Transformer } from "../types/transformer";
 import { log } from "../utils/log";
 import { NewAPIToolCleaner } from "../utils/tool-cleaner";
 
+const encoder = new TextEncoder();
+
 // 版本号常量定义
 const NEWAPI_VERSION = "v18.1"; // 🎯 精简稳定版本
 
@@ -113,7 +115,6 @@ export class NewAPITransformer implements Transformer {
       }
 
       const decoder = new TextDecoder();
-      const encoder = new TextEncoder();
 
       const stream = new ReadableStream({
         async start(controller) {
@@ -151,9 +152,12 @@ export class NewAPITransformer implements Transformer {
                     const delta = data.choices?.[0]?.delta;
                     if (delta) {
                       // 追踪推理内容
+                      // 逐chunk日志仅在调试模式下输出，避免每个chunk都格式化并写一次日志
                       if (delta.reasoning_content) {
                         reasoningAccumulator += delta.reasoning_content;
-                        log(`${LOG_MARKERS.THINKING_TRACK} 推理内容累积 - 当前长度: ${reasoningAccumulator.length}, 新增: ${delta.reasoning_content.length}`);
+                        if (SAFE_CONFIG.DEBUG_MODE) {
+                          log(`${LOG_MARKERS.THINKING_TRACK} 推理内容累积 - 当前长度: ${reasoningAccumulator.length}, 新增: ${delta.reasoning_content.length}`);
+                        }
                       }
 
                       // 追踪正文内容
@@ -163,7 +167,9 @@ export class NewAPITransformer implements Transformer {
 
                       // 🔧 关键转换：将reasoning_content转换为thinking
     if (delta.reasoning_content) {
-                        log(`${LOG_MARKERS.REASONING_CONVERT} 转换reasoning_content → delta.thinking`);
+                        if (SAFE_CONFIG.DEBUG_MODE) {
+                          log(`${LOG_MARKERS.REASONING_CONVERT} 转换reasoning_content → delta.thinking`);
+                        }
                         delta.thinking = { content: delta.reasoning_content };
                         delete delta.reasoning_content;
     }
@@ -208,14 +214,22 @@ export class NewAPITransformer implements Transformer {
       });
     } else {
       log(`${LOG_MARKERS.RESPONSE_IN} 处理非流式响应`);
-      const jsonResponse = await response.json();
-
-      if (jsonResponse.choices?.[0]?.message?.reasoning_content) {
-        log(`${LOG_MARKERS.REASONING_CONVERT} 检测到reasoning_content，转换为thinking格式`);
-        const reasoning = jsonResponse.choices[0].message.reasoning_content;
-        jsonResponse.choices[0].message.thinking = { content: reasoning };
+      const responseText = await response.text();
+      const jsonResponse = JSON.parse(responseText);
+
+      // 没有 reasoning_content 时内容无需改动，直接返回原文，省去重新序列化
+      if (!jsonResponse.choices?.[0]?.message?.reasoning_content) {
+        return new Response(responseText, {
+          status: response.status,
+          statusText: response.statusText,
+          headers: response.headers,
+        });
       }
 
+      log(`${LOG_MARKERS.REASONING_CONVERT} 检测到reasoning_content，转换为thinking格式`);
+      const reasoning = jsonResponse.choices[0].message.reasoning_content;
+      jsonResponse.choices[0].message.thinking = { content: reasoning };
+
       return new Response(JSON.stringify(jsonResponse), {
         status: response.status,
         statusText: response.statusText,
@@ -226,48 +240,46 @@ export class NewAPITransformer implements Transformer {
 
   /**
    * 修复Claude thinking模式的参数格式
+   * 直接修改传入请求的顶层字段，依赖 transformRequestIn 中的 { ...request } 浅拷贝
    */
   private fixThinkingModeParameters(request: UnifiedChatRequest): UnifiedChatRequest {
     log(`${LOG_MARKERS.MODEL_THINKING} 开始修复thinking模式参数`);
-    const fixedRequest = { ...request };
-
-    (fixedRequest as any).thinking = {
+    (request as any).thinking = {
       type: "enabled",
       budget_tokens: 10000
     };
     log(`${LOG_MARKERS.MODEL_THINKING} 已添加thinking参数: type=enabled, budget_tokens=10000`);
 
-    if (fixedRequest.messages && fixedRequest.messages.length > 0) {
-      fixedRequest.messages = this.fixMessagesForThinking(fixedRequest.messages);
+    if (request.messages && request.messages.length > 0) {
+      request.messages = this.fixMessagesForThinking(request.messages);
   }
 
-    if (fixedRequest.tool_choice && typeof fixedRequest.tool_choice === 'object') {
-      if (fixedRequest.tool_choice.type === "any" || fixedRequest.tool_choice.type === "tool") {
-        log(`${LOG_MARKERS.TOOL_CHOICE} 修正tool_choice: 不支持thinking模式的'${fixedRequest.tool_choice.type}'，改为'auto'`);
-        fixedRequest.tool_choice = "auto";
+    if (request.tool_choice && typeof request.tool_choice === 'object') {
+      if (request.tool_choice.type === "any" || request.tool_choice.type === "tool") {
+        log(`${LOG_MARKERS.TOOL_CHOICE} 修正tool_choice: 不支持thinking模式的'${request.tool_choice.type}'，改为'auto'`);
+        request.tool_choice = "auto";
 } 
     }
 
     log(`${LOG_MARKERS.MODEL_THINKING} thinking模式参数修复完成`);
-    return fixedRequest;
+    return request;
   }
 
   private fixMessagesForThinking(messages: any[]): any[] {
     log(`${LOG_MARKERS.MSG_ANALYSIS} 开始分析消息格式 - 总消息数: ${messages.length}`);
+    // 单次遍历同时统计各角色数量并记录assistant消息位置
     const messageStats: { [key: string]: number } = {};
-    messages.forEach((msg, i) => {
-      messageStats[msg.role] = (messageStats[msg.role] || 0) + 1;
-    });
-
-    log(`${LOG_MARKERS.STATS} 消息统计: ${Object.entries(messageStats).map(([role, count]) => `${role}=${count}`).join(', ')}`);
-
     const assistantIndices: number[] = [];
     for (let i = 0; i < messages.length; i++) {
-      if (messages[i].role === 'assistant') {
+      const role = messages[i].role;
+      messageStats[role] = (messageStats[role] || 0) + 1;
+      if (role === 'assistant') {
         assistantIndices.push(i);
       }
     }
 
+    log(`${LOG_MARKERS.STATS} 消息统计: ${Object.entries(messageStats).map(([role, count]) => `${role}=${count}`).join(', ')}`);
+
     if (assistantIndices.length === 0) {
       log(`${LOG_MARKERS.INFO} 未找到assistant消息，无需修复thinking块`);
       return messages;
@@ -28,19 +28,12 @@ export class OpenAITransformer implements Transformer {
    * @returns - 準備發回給客戶端的最終響應 (Promise<Response>)
    */
   async transformResponseOut(response: Response): Promise<Response> {
-    // 克隆響應以安全地讀取其內容
-    const responseClone = response.clone();
+    // 克隆響應並記錄原文
     try {
-      const responseBody = await responseClone.json();
-      log(
-        "[OpenAI-Transformer] 發送最終響應:",
-        JSON.stringify(responseBody, null, 2)
-      );
-    } catch (error) {
-      log("[OpenAI-Transformer] 無法解析最終響應為 JSON:", error);
-      // 如果解析失敗，可以記錄文本內容
       const textBody = await response.clone().text();
-      log("[OpenAI-Transformer] 最終響應 (文本):", textBody);
+      log("[OpenAI-Transformer] 發送最終響應:", textBody);
+    } catch (error) {
+      log("[OpenAI-Transformer] 無法讀取最終響應:", error);
     }
 
     // 返回原始響應，因為 clone 後的 body 只能讀取一次
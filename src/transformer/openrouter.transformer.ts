@@ -1,6 +1,8 @@
 import { MessageContent, TextContent, UnifiedChatRequest } from "@/types/llm";
 import { Transformer } from "../types/transformer";
 
+const encoder = new TextEncoder();
+
 export class OpenrouterTransformer implements Transformer {
   name = "openrouter";
 
@@ -22,22 +24,22 @@ export class OpenrouterTransformer implements Transformer {
   }
 
   async transformResponseOut(response: Response): Promise<Response> {
-    if (response.headers.get("Content-Type")?.includes("application/json")) {
-      const jsonResponse = await response.json();
-
-      // Handle non-streaming response if needed
-      return new Response(JSON.stringify(jsonResponse), {
+    const contentType = response.headers.get("Content-Type");
+    if (contentType?.includes("application/json")) {
+      const responseText = await response.text();
+      // Validate the JSON body, then return the original text
+      JSON.parse(responseText);
+      return new Response(responseText, {
         status: response.status,
         statusText: response.statusText,
         headers: response.headers,
       });
-    } else if (response.headers.get("Content-Type")?.includes("stream")) {
+    } else if (contentType?.includes("stream")) {
       if (!response.body) {
         return response;
       }
 
       const decoder = new TextDecoder();
-      const encoder = new TextEncoder();
 
       let hasTextContent = false;
       let reasoningContent = "";
@@ -66,25 +68,14 @@ export class OpenrouterTransformer implements Transformer {
 
                     // Extract reasoning_content from delta
                     if (data.choices?.[0]?.delta?.reasoning) {
-                      reasoningContent += data.choices[0].delta.reasoning;
-                      const thinkingChunk = {
-                        ...data,
-                        choices: [
-                          {
-                            ...data.choices[0],
-                            delta: {
-                              ...data.choices[0].delta,
-                              thinking: {
-                                content: data.choices[0].delta.reasoning,
-                              },
-                            },
-                          },
-                        ],
+                      const delta = data.choices[0].delta;
+                      reasoningContent += delta.reasoning;
+                      // Move reasoning into a thinking block in place
+                      delta.thinking = {
+                        content: delta.reasoning,
                       };
-                      delete thinkingChunk.choices[0].delta.reasoning;
-                      const thinkingLine = `data: ${JSON.stringify(
-                        thinkingChunk
-                      )}\n\n`;
+                      delete delta.reasoning;
+                      const thinkingLine = `data: ${JSON.stringify(data)}\n\n`;
                       controller.enqueue(encoder.encode(thinkingLine));
                       continue;
                     }
@@ -162,7 +153,7 @@ export class OpenrouterTransformer implements Transformer {
         status: response.status,
         statusText: response.statusText,
         headers: {
-          "Content-Type": response.headers.get("Content-Type") || "text/plain",
+          "Content-Type": contentType || "text/plain",
           "Cache-Control": "no-cache",
           Connection: "keep-alive",
         },
@@ -1,6 +1,8 @@
 import { UnifiedChatRequest } from "../types/llm";
 import { Transformer } from "../types/transformer";
 
+const encoder = new TextEncoder();
+
 export class TooluseTransformer implements Transformer {
   name = "tooluse";
 
@@ -40,7 +42,8 @@ Examples:
   }
 
   async transformResponseOut(response: Response): Promise<Response> {
-    if (response.headers.get("Content-Type")?.includes("application/json")) {
+    const contentType = response.headers.get("Content-Type");
+    if (contentType?.includes("application/json")) {
       const jsonResponse = await response.json();
       if (
         jsonResponse?.choices[0]?.message.tool_calls?.length &&
@@ -59,13 +62,12 @@ Examples:
         statusText: response.statusText,
         headers: response.headers,
       });
-    } else if (response.headers.get("Content-Type")?.includes("stream")) {
+    } else if (contentType?.includes("stream")) {
       if (!response.body) {
         return response;
       }
 
       const decoder = new TextDecoder();
-      const encoder = new TextEncoder();
       let exitToolIndex = -1;
       let exitToolResponse = "";
 
@@ -151,7 +153,7 @@ Examples:
         status: response.status,
         statusText: response.statusText,
         headers: {
-          "Content-Type": response.headers.get("Content-Type") || "text/plain",
+          "Content-Type": contentType || "text/plain",
           "Cache-Control": "no-cache",
           Connection: "keep-alive",
         },
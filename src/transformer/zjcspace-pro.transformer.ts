@@ -3,6 +3,12 @@ import { UnifiedChatRequest } from "../types/llm";
 import { LLMProvider } from "../types/llm";
 import { log } from "@/utils/log";
 
+const encoder = new TextEncoder();
+
+// Only braces affect the JSON framing state, so the stream scanner jumps between them
+// instead of visiting every character. Used synchronously, so sharing lastIndex is safe.
+const BRACE_PATTERN = /[{}]/g;
+
 export class ZjcspaceProTransformer implements Transformer {
   static LOG_PREFIX = '[ZjcspaceProTransformer v1.0.0]';
   name = "zjcspace-pro";
@@ -92,7 +98,6 @@ export class ZjcspaceProTransformer implements Transformer {
 
     log(`${LOG_MARKERS.STREAM_PROCESSING} Response detected, starting manual stream processing...`);
     const decoder = new TextDecoder("utf-8");
-    const encoder = new TextEncoder();
 
     const stream = new ReadableStream({
       async start(controller) {
@@ -101,6 +106,9 @@ export class ZjcspaceProTransformer implements Transformer {
         let buffer = "";
         let braceCount = 0;
         let jsonStartIndex = -1;
+        // Scan position persists across reads, so only newly arrived data is scanned
+        // and no brace is counted twice
+        let cursor = 0;
 
         try {
           while (true) {
@@ -121,20 +129,22 @@ export class ZjcspaceProTransformer implements Transformer {
 
             buffer += decoder.decode(value, { stream: true });
 
-            let cursor = 0;
-            while (cursor < buffer.length) {
-              const char = buffer[cursor];
+            BRACE_PATTERN.lastIndex = cursor;
+            let braceMatch: RegExpExecArray | null;
+            while ((braceMatch = BRACE_PATTERN.exec(buffer)) !== null) {
+              const index = braceMatch.index;
+              const char = braceMatch[0];
               
               if (braceCount === 0 && char === '{') {
                 braceCount = 1;
-                jsonStartIndex = cursor;
+                jsonStartIndex = index;
               } else if (jsonStartIndex !== -1) {
                 if (char === '{') braceCount++;
                 if (char === '}') braceCount--;
               }
 
               if (jsonStartIndex !== -1 && braceCount === 0) {
-                const jsonString = buffer.substring(jsonStartIndex, cursor + 1);
+                const jsonString = buffer.substring(jsonStartIndex, index + 1);
                 
                 try {
                   const jsonData = JSON.parse(jsonString);
@@ -158,12 +168,13 @@ export class ZjcspaceProTransformer implements Transformer {
                   log(`${LOG_MARKERS.ERROR} JSON parse failed, skipping chunk:`, jsonString, e);
                 }
 
-                buffer = buffer.substring(cursor + 1);
-                cursor = -1;
+                buffer = buffer.substring(index + 1);
+                BRACE_PATTERN.lastIndex = 0;
                 jsonStartIndex = -1;
               }
-              cursor++;
             }
+            // Everything up to the end of the buffer has been scanned
+            cursor = buffer.length;
           }
         } catch (error) {
           log(`${LOG_MARKERS.ERROR} Manual stream processing exception:`, error);
@@ -5,6 +5,73 @@ import { log } from "@/utils/log"; // 如果有 log 工具
 import * as fs from 'fs';
 import * as path from 'path';
 
+const encoder = new TextEncoder();
+
+// cleanContent 使用的正则，模块加载时编译一次，避免每条消息重复构造
+const NESTED_IMAGE_PATTERN = /\[!\[([^\]]*)\]\(([^)]+)\)\]\(([^)]+)\)/g;
+const INCOMPLETE_LINK_PATTERN = /\[([^\]]+)\]\(([^)]*)$/gm;
+const MARKDOWN_LINK_PATTERN = /\[([^\]]+)\]\(([^)]+)\)/g;
+const WINDOWS_PATH_PATTERN = /\\\\/g;
+const NESTED_IMAGE_OR_WINDOWS_PATH_PATTERN = new RegExp(
+  `${NESTED_IMAGE_PATTERN.source}|${WINDOWS_PATH_PATTERN.source}`,
+  'g'
+);
+const WHITESPACE_PATTERN = /\s+/g;
+// 存在连续空白或非空格的空白字符（换行、制表符等）时，折叠空白才会改变内容
+const COLLAPSIBLE_WHITESPACE_PATTERN = /\s\s|[^\S ]/;
+// 看起来像域名的URL：包含 '.'，且不含空格和反斜杠
+const LOOKS_LIKE_DOMAIN_PATTERN = /^[^ \\]*\.[^ \\]*$/;
+const MALFORMED_IMAGE_PATTERN = /!\[([^\]]*)\]\(([^)]*)\)/g;
+const MALFORMED_IMAGE_OR_WHITESPACE_PATTERN = new RegExp(
+  `${MALFORMED_IMAGE_PATTERN.source}|${WHITESPACE_PATTERN.source}`,
+  'g'
+);
+// 响应中 ```json 代码块的提取正则
+const JSON_CODE_BLOCK_PATTERN = /```json\n([\s\S]*?)\n```/;
+// debug 文件名中时间戳的非法字符
+const TIMESTAMP_UNSAFE_CHARS = /[:.]/g;
+// debug 文件的 JSON 缩进，默认紧凑输出；需要人工阅读时设置 ZJCSPACE_DEBUG_JSON_INDENT=2
+const DEBUG_JSON_INDENT = parseInt(process.env.ZJCSPACE_DEBUG_JSON_INDENT || '0', 10) || undefined;
+
+// 字段白名单在模块加载时构建一次；使用 Set 做成员判断，迭代顺序与声明顺序一致
+// 顶层字段白名单 - 遵循OpenAI标准
+const ALLOWED_TOP_FIELDS = new Set([
+  'model', 'messages', 'tools', 'tool_choice', 'stream', 'max_tokens', 'max_completion_tokens',
+  'temperature', 'top_p', 'n', 'stop', 'user', 'logprobs', 'top_logprobs', 'response_format',
+  'seed', 'parallel_tool_calls', 'web_search_options', 'audio', 'modalities', 'prediction',
+  'reasoning_effort', 'metadata', 'store'
+]);
+// messages 字段白名单 (已修改，支持多轮对话和工具调用)
+const ALLOWED_MESSAGE_FIELDS = new Set(['role', 'content', 'name', 'tool_calls', 'tool_call_id']);
+// function 字段白名单
+const ALLOWED_FUNCTION_FIELDS = new Set(['name', 'description', 'parameters']);
+// parameters 字段白名单 - 严格按照OpenAI官方文档
+const ALLOWED_PARAMETER_FIELDS = new Set([
+  'type', 'properties', 'required', 'enum', 'description', 'items'
+]);
+
+// 单次遍历统计方括号/圆括号数量，替代四次 match 全量扫描
+function countBrackets(content: string) {
+  let openBrackets = 0, closeBrackets = 0, openParens = 0, closeParens = 0;
+  for (let i = 0; i < content.length; i++) {
+    switch (content.charCodeAt(i)) {
+      case 0x5b: openBrackets++; break;  // [
+      case 0x5d: closeBrackets++; break; // ]
+      case 0x28: openParens++; break;    // (
+      case 0x29: closeParens++; break;   // )
+    }
+  }
+  return { openBrackets, closeBrackets, openParens, closeParens };
+}
+
+// 判断对象是否没有自有可枚举属性
+function isEmptyObject(obj: object): boolean {
+  for (const k in obj) {
+    if (Object.prototype.hasOwnProperty.call(obj, k)) return false;
+  }
+  return true;
+}
+
 export class ZjcspaceTransformer implements Transformer {
   static LOG_PREFIX = '[ZjcspaceTransformer v1.7.0]';
   name = "zjcspace"; 
@@ -81,23 +148,30 @@ export class ZjcspaceTransformer implements Transformer {
     }
   }
 
+  // 写入当前工作目录的debug文件夹，目录不存在时创建后重试
+  // 序列化同步完成（保存调用时的快照），磁盘写入异步进行，不阻塞请求/响应处理
+  private writeDebugFile(filename: string, debugData: any): Promise<string> {
+    const debugDir = path.join(process.cwd(), 'debug');
+    const filepath = path.join(debugDir, filename);
+    const content = JSON.stringify(debugData, null, DEBUG_JSON_INDENT);
+    return fs.promises.writeFile(filepath, content, 'utf8')
+      .catch(async (error: any) => {
+        if (error?.code !== 'ENOENT') throw error;
+        await fs.promises.mkdir(debugDir, { recursive: true });
+        await fs.promises.writeFile(filepath, content, 'utf8');
+      })
+      .then(() => filepath);
+  }
+
   // 持久化请求体到debug目录
   private persistRequestBody(requestBody: any, requestId: string): void {
     try {
-      // 使用当前工作目录的debug文件夹
-      const debugDir = path.join(process.cwd(), 'debug');
-      
-      // 确保debug目录存在
-      if (!fs.existsSync(debugDir)) {
-        fs.mkdirSync(debugDir, { recursive: true });
-      }
-      
-      const timestamp = new Date().toISOString().replace(/[:.]/g, '-');
-      const filename = `request-${requestId}-${timestamp}.json`;
-      const filepath = path.join(debugDir, filename);
+      // 同一时间戳既写入文件内容，也清洗后用于文件名
+      const timestamp = new Date().toISOString();
+      const filename = `request-${requestId}-${timestamp.replace(TIMESTAMP_UNSAFE_CHARS, '-')}.json`;
       
       const debugData = {
-        timestamp: new Date().toISOString(),
+        timestamp,
         requestId,
         requestBody,
         metadata: {
@@ -106,8 +180,9 @@ export class ZjcspaceTransformer implements Transformer {
         }
       };
       
-      fs.writeFileSync(filepath, JSON.stringify(debugData, null, 2), 'utf8');
-      log(`[ZjcspaceTransformer] 💾 请求体已持久化到: ${filepath}`);
+      this.writeDebugFile(filename, debugData)
+        .then(filepath => log(`[ZjcspaceTransformer] 💾 请求体已持久化到: ${filepath}`))
+        .catch(error => log(`[ZjcspaceTransformer] ❌ 持久化请求体失败: ${error}`));
     } catch (error) {
       log(`[ZjcspaceTransformer] ❌ 持久化请求体失败: ${error}`);
     }
@@ -116,20 +191,12 @@ export class ZjcspaceTransformer implements Transformer {
   // 持久化响应体到debug目录
   private persistResponseBody(responseBody: any, requestId: string, status: number): void {
     try {
-      // 使用当前工作目录的debug文件夹
-      const debugDir = path.join(process.cwd(), 'debug');
-      
-      // 确保debug目录存在
-      if (!fs.existsSync(debugDir)) {
-        fs.mkdirSync(debugDir, { recursive: true });
-      }
-      
-      const timestamp = new Date().toISOString().replace(/[:.]/g, '-');
-      const filename = `response-${requestId}-${timestamp}.json`;
-      const filepath = path.join(debugDir, filename);
+      // 同一时间戳既写入文件内容，也清洗后用于文件名
+      const timestamp = new Date().toISOString();
+      const filename = `response-${requestId}-${timestamp.replace(TIMESTAMP_UNSAFE_CHARS, '-')}.json`;
       
       const debugData = {
-        timestamp: new Date().toISOString(),
+        timestamp,
         requestId,
         status,
         responseBody,
@@ -139,8 +206,9 @@ export class ZjcspaceTransformer implements Transformer {
         }
       };
       
-      fs.writeFileSync(filepath, JSON.stringify(debugData, null, 2), 'utf8');
-      log(`[ZjcspaceTransformer] 💾 响应体已持久化到: ${filepath}`);
+      this.writeDebugFile(filename, debugData)
+        .then(filepath => log(`[ZjcspaceTransformer] 💾 响应体已持久化到: ${filepath}`))
+        .catch(error => log(`[ZjcspaceTransformer] ❌ 持久化响应体失败: ${error}`));
     } catch (error) {
       log(`[ZjcspaceTransformer] ❌ 持久化响应体失败: ${error}`);
     }
@@ -162,26 +230,6 @@ export class ZjcspaceTransformer implements Transformer {
     // 输入验证日志
     this.log('info', `${LOG_MARKERS.INPUT_VALIDATION} 开始处理请求 - model: ${request.model}, messages数量: ${request.messages?.length || 0}, tools数量: ${request.tools?.length || 0}`, 'input');
     this.log('debug', `${LOG_MARKERS.INPUT_VALIDATION} provider信息 - baseUrl: ${provider.baseUrl}, apiKey长度: ${provider.apiKey?.length || 0}`, 'input');
-    // 顶层字段白名单 - 遵循OpenAI标准
-    const allowedTop = [
-      'model', 'messages', 'tools', 'tool_choice', 'stream', 'max_tokens', 'max_completion_tokens',
-      'temperature', 'top_p', 'n', 'stop', 'user', 'logprobs', 'top_logprobs', 'response_format',
-      'seed', 'parallel_tool_calls', 'web_search_options', 'audio', 'modalities', 'prediction',
-      'reasoning_effort', 'metadata', 'store'
-    ];
-    
-    // messages 字段白名单 (已修改，支持多轮对话和工具调用)
-    const allowedMsg = ['role', 'content', 'name', 'tool_calls', 'tool_call_id'];
-    
-    // tools 字段白名单
-    const allowedTool = ['type', 'function'];
-    // function 字段白名单
-    const allowedFn = ['name', 'description', 'parameters'];
-    // parameters 字段白名单 - 严格按照OpenAI官方文档
-    const allowedParam = [
-      'type', 'properties', 'required', 'enum', 'description', 'items'
-    ];
-
     // 字段变更追踪
     const removedFields: string[] = [];
     const addedFields: string[] = [];
@@ -192,11 +240,11 @@ export class ZjcspaceTransformer implements Transformer {
       if (!params || typeof params !== 'object') return params;
       const cleaned: any = {};
       for (const k in params) {
-        if (!allowedParam.includes(k)) {
+        if (!ALLOWED_PARAMETER_FIELDS.has(k)) {
           removedFields.push(path ? `${path}.${k}` : k);
         }
       }
-      for (const k of allowedParam) {
+      for (const k of ALLOWED_PARAMETER_FIELDS) {
         if (params[k] !== undefined) {
           if (k === 'properties' && typeof params[k] === 'object') {
             cleaned.properties = {};
@@ -230,11 +278,11 @@ export class ZjcspaceTransformer implements Transformer {
           const fn = tool.function;
           const cleanedFn: any = {};
           for (const k in fn) {
-            if (!allowedFn.includes(k)) {
+            if (!ALLOWED_FUNCTION_FIELDS.has(k)) {
               removedFields.push(`tools[${idx}].function.${k}`);
             }
           }
-          for (const k of allowedFn) {
+          for (const k of ALLOWED_FUNCTION_FIELDS) {
             if (fn[k] !== undefined) {
               if (k === 'parameters') {
                 cleanedFn.parameters = strictCleanParameters(fn.parameters, `tools[${idx}].function.parameters`);
@@ -280,57 +328,66 @@ export class ZjcspaceTransformer implements Transformer {
           brokenSyntax: 0
         };
         
+        // 链接与图片语法都以 '[' 开头，内容中没有 '[' 时（常见的纯文本）直接跳过相关步骤
+        const hasMarkdownSyntax = cleanedContent.indexOf('[') !== -1;
+        
         // 1. 修复嵌套Markdown图片语法 [![...](...)](...) -> [...](...)
-        const nestedImagePattern = /\[!\[([^\]]*)\]\(([^)]+)\)\]\(([^)]+)\)/g;
-        const nestedImageMatches = content.match(nestedImagePattern);
-        if (nestedImageMatches && nestedImageMatches.length > 0) {
-          cleanupStats.nestedImages = nestedImageMatches.length;
-          this.log('warn', `${LOG_MARKERS.MESSAGES_PROCESSING} 检测到嵌套Markdown图片语法，进行清理: ${nestedImageMatches.length} 个`, 'messages');
-          cleanedContent = cleanedContent.replace(nestedImagePattern, '[$1]($3)');
+        // 3. 同时修复Windows路径格式 \\\\ -> /
+        // 两者互不影响（中间的链接修复步骤不涉及反斜杠），合并为一个模式只扫描一遍全文；
+        // 计数在 replace 回调中完成
+        const fixWindowsPaths = (text: string): string =>
+          text.replace(WINDOWS_PATH_PATTERN, () => {
+            cleanupStats.windowsPaths++;
+            return '/';
+          });
+        cleanedContent = cleanedContent.replace(NESTED_IMAGE_OR_WINDOWS_PATH_PATTERN, (_match, alt, _src, href) => {
+          if (alt === undefined) {
+            cleanupStats.windowsPaths++;
+            return '/';
+          }
+          cleanupStats.nestedImages++;
+          // 保留下来的 alt / href 中的路径同样需要修复
+          return `[${fixWindowsPaths(alt)}](${fixWindowsPaths(href)})`;
+        });
+        if (cleanupStats.nestedImages > 0) {
+          this.log('warn', `${LOG_MARKERS.MESSAGES_PROCESSING} 检测到嵌套Markdown图片语法，进行清理: ${cleanupStats.nestedImages} 个`, 'messages');
         }
         
-        // 2. 修复不完整的Markdown链接语法
-        // 2.1 修复缺少右括号的链接 [...](... -> [...](...)
-        const incompleteLinkPattern = /\[([^\]]+)\]\(([^)]*)$/gm;
-        const incompleteLinkMatches = cleanedContent.match(incompleteLinkPattern);
-        if (incompleteLinkMatches && incompleteLinkMatches.length > 0) {
-          cleanupStats.malformedLinks += incompleteLinkMatches.length;
-          this.log('warn', `${LOG_MARKERS.MESSAGES_PROCESSING} 检测到不完整的Markdown链接，进行修复: ${incompleteLinkMatches.length} 个`, 'messages');
-          cleanedContent = cleanedContent.replace(incompleteLinkPattern, '[$1]($2)');
-        }
+        if (hasMarkdownSyntax) {
+          // 2. 修复不完整的Markdown链接语法
+          // 2.1 修复缺少右括号的链接 [...](... -> [...](...)
+          cleanedContent = cleanedContent.replace(INCOMPLETE_LINK_PATTERN, (_match, text, url) => {
+            cleanupStats.malformedLinks++;
+            return `[${text}](${url})`;
+          });
+          if (cleanupStats.malformedLinks > 0) {
+            this.log('warn', `${LOG_MARKERS.MESSAGES_PROCESSING} 检测到不完整的Markdown链接，进行修复: ${cleanupStats.malformedLinks} 个`, 'messages');
+          }
         
-        // 2.2 修复缺少左括号的链接 [...](... -> [...](...)
-        const missingOpenBracketPattern = /\[([^\]]+)\]\(([^)]+)\)/g;
-        const validLinks = cleanedContent.match(missingOpenBracketPattern);
-        if (validLinks) {
-          // 检查是否有不匹配的括号
-          const openBrackets = (cleanedContent.match(/\[/g) || []).length;
-          const closeBrackets = (cleanedContent.match(/\]/g) || []).length;
-          const openParens = (cleanedContent.match(/\(/g) || []).length;
-          const closeParens = (cleanedContent.match(/\)/g) || []).length;
+          // 2.2 修复缺少左括号的链接 [...](... -> [...](...)
+          // 只需判断是否存在链接，search 找到第一个即返回，不必 match 出全部链接数组
+          if (cleanedContent.search(MARKDOWN_LINK_PATTERN) !== -1) {
+            // 检查是否有不匹配的括号
+            const { openBrackets, closeBrackets, openParens, closeParens } = countBrackets(cleanedContent);
           
-          if (openBrackets !== closeBrackets || openParens !== closeParens) {
-            cleanupStats.brokenSyntax = Math.abs(openBrackets - closeBrackets) + Math.abs(openParens - closeParens);
-            this.log('warn', `${LOG_MARKERS.MESSAGES_PROCESSING} 检测到不匹配的括号，进行修复: 方括号差${Math.abs(openBrackets - closeBrackets)}, 圆括号差${Math.abs(openParens - closeParens)}`, 'messages');
+            if (openBrackets !== closeBrackets || openParens !== closeParens) {
+              cleanupStats.brokenSyntax = Math.abs(openBrackets - closeBrackets) + Math.abs(openParens - closeParens);
+              this.log('warn', `${LOG_MARKERS.MESSAGES_PROCESSING} 检测到不匹配的括号，进行修复: 方括号差${Math.abs(openBrackets - closeBrackets)}, 圆括号差${Math.abs(openParens - closeParens)}`, 'messages');
+            }
           }
         }
         
-        // 3. 修复Windows路径格式 \\\\ -> /
-        const windowsPathPattern = /\\\\/g;
-        const windowsPathMatches = cleanedContent.match(windowsPathPattern);
-        if (windowsPathMatches && windowsPathMatches.length > 0) {
-          cleanupStats.windowsPaths = windowsPathMatches.length;
-          this.log('info', `${LOG_MARKERS.MESSAGES_PROCESSING} 检测到Windows路径格式，进行修复: ${windowsPathMatches.length} 个`, 'messages');
-          cleanedContent = cleanedContent.replace(windowsPathPattern, '/');
+        // 3. Windows路径已在第1步中一并修复，这里只输出日志
+        if (cleanupStats.windowsPaths > 0) {
+          this.log('info', `${LOG_MARKERS.MESSAGES_PROCESSING} 检测到Windows路径格式，进行修复: ${cleanupStats.windowsPaths} 个`, 'messages');
         }
         
         // 4. 修复无效的URL格式
         // 4.1 修复缺少协议的URL
-        const urlPattern = /\[([^\]]+)\]\(([^)]+)\)/g;
-        const urlMatches = cleanedContent.match(urlPattern);
-        if (urlMatches) {
+        // replace 回调逐个处理匹配，没有链接时原样返回
+        if (hasMarkdownSyntax) {
           let invalidUrlCount = 0;
-          cleanedContent = cleanedContent.replace(urlPattern, (match, text, url) => {
+          cleanedContent = cleanedContent.replace(MARKDOWN_LINK_PATTERN, (match, text, url) => {
             // 检查URL是否有效
             if (url && !url.startsWith('http://') && !url.startsWith('https://') && !url.startsWith('mailto:') && !url.startsWith('tel:') && !url.startsWith('#')) {
               // 如果是相对路径或本地路径，保持原样
@@ -338,7 +395,7 @@ export class ZjcspaceTransformer implements Transformer {
                 return match;
               }
               // 如果是看起来像域名的，添加https://
-              if (url.includes('.') && !url.includes(' ') && !url.includes('\\')) {
+              if (LOOKS_LIKE_DOMAIN_PATTERN.test(url)) {
                 invalidUrlCount++;
                 return `[${text}](https://${url})`;
               }
@@ -360,20 +417,23 @@ export class ZjcspaceTransformer implements Transformer {
         }
         
         // 6. 修复其他常见的Markdown语法问题
-        // 6.1 修复多余的空格
-        cleanedContent = cleanedContent.replace(/\s+/g, ' ').replace(/\n\s*\n\s*\n/g, '\n\n');
-        
+        // 6.1 修复多余的空格（所有空白已折叠为单个空格，不会再残留连续换行）
         // 6.2 修复不正确的图片语法
-        const malformedImagePattern = /!\[([^\]]*)\]\(([^)]*)\)/g;
-        const malformedImages = cleanedContent.match(malformedImagePattern);
-        if (malformedImages) {
-          cleanedContent = cleanedContent.replace(malformedImagePattern, (match, alt, src) => {
+        // 有链接语法时两步合并为一次扫描：图片内部的空白在回调中折叠，结果与先折叠再修复图片一致
+        if (hasMarkdownSyntax) {
+          cleanedContent = cleanedContent.replace(MALFORMED_IMAGE_OR_WHITESPACE_PATTERN, (match, alt, src) => {
+            if (alt === undefined) {
+              return ' ';
+            }
             // 如果alt为空，使用默认值
             if (!alt || alt.trim() === '') {
-              return `![图片](${src})`;
+              return `![图片](${src.replace(WHITESPACE_PATTERN, ' ')})`;
             }
-            return match;
+            return match.replace(WHITESPACE_PATTERN, ' ');
           });
+        } else if (COLLAPSIBLE_WHITESPACE_PATTERN.test(cleanedContent)) {
+          // 只有单个空格时折叠是空操作，跳过整段替换
+          cleanedContent = cleanedContent.replace(WHITESPACE_PATTERN, ' ');
         }
         
         // 记录清理统计
@@ -393,7 +453,7 @@ export class ZjcspaceTransformer implements Transformer {
       
       const cleaned = messages.map((msg, idx) => {
         const cleanedMsg: any = {};
-        for (const k of allowedMsg) {
+        for (const k of ALLOWED_MESSAGE_FIELDS) {
           if (msg[k] !== undefined) {
             if (k === 'content') {
               // content 只允许 string, array, 或在 tool_calls 存在时为 null
@@ -424,7 +484,7 @@ export class ZjcspaceTransformer implements Transformer {
         const cleaned: any = {};
         for (const k in obj) {
           const v = deepStrictClean(obj[k]);
-          if (v !== undefined && v !== null && !(Array.isArray(v) && v.length === 0) && !(typeof v === 'object' && Object.keys(v).length === 0)) {
+          if (v !== undefined && v !== null && !(Array.isArray(v) && v.length === 0) && !(typeof v === 'object' && isEmptyObject(v))) {
             cleaned[k] = v;
           }
         }
@@ -435,39 +495,17 @@ export class ZjcspaceTransformer implements Transformer {
     // 构建严格格式化后的请求体
     this.log('info', `${LOG_MARKERS.REQUEST_BODY} 开始构建请求体`, 'requestBody');
     
-    const cleanedMessages = strictCleanMessages(request.messages);
-    const rawStrict: Record<string, any> = {
-      model: request.model,
-      messages: cleanedMessages,
+    // 需要特殊处理的字段；其余白名单字段直接取自原始请求，未设置的字段不写入请求体
+    const overrides: Record<string, any> = {
+      messages: strictCleanMessages(request.messages),
       tools: strictCleanTools(request.tools ?? []),
-      tool_choice: request.tool_choice, // 按实际请求体决定
       stream: false, // 强制非流式请求 - 这样服务器会返回非流式响应，便于准确转发
-      max_tokens: request.max_tokens,
-      max_completion_tokens: (request as any).max_completion_tokens,
-      temperature: request.temperature,
-      top_p: (request as any).top_p,
-      n: (request as any).n,
-      stop: (request as any).stop,
-      user: (request as any).user,
-      logprobs: (request as any).logprobs,
-      top_logprobs: (request as any).top_logprobs,
-      response_format: (request as any).response_format,
-      seed: (request as any).seed,
-      parallel_tool_calls: (request as any).parallel_tool_calls,
-      web_search_options: (request as any).web_search_options,
-      audio: (request as any).audio,
-      modalities: (request as any).modalities,
-      prediction: (request as any).prediction,
-      reasoning_effort: (request as any).reasoning_effort,
-      metadata: (request as any).metadata,
-      store: (request as any).store,
     };
     
-    this.log('debug', `${LOG_MARKERS.REQUEST_BODY} 原始请求体字段: ${Object.keys(rawStrict).filter(k => rawStrict[k] !== undefined).join(', ')}`, 'requestBody');
-    
     const requestBody: any = {};
-    for (const k of allowedTop) {
-      if (rawStrict[k] !== undefined) requestBody[k] = rawStrict[k];
+    for (const k of ALLOWED_TOP_FIELDS) {
+      const v = k in overrides ? overrides[k] : (request as any)[k];
+      if (v !== undefined) requestBody[k] = v;
     }
     
     this.log('debug', `${LOG_MARKERS.REQUEST_BODY} 白名单过滤后字段: ${Object.keys(requestBody).join(', ')}`, 'requestBody');
@@ -536,14 +574,10 @@ export class ZjcspaceTransformer implements Transformer {
     });
     this.log('info', `${LOG_MARKERS.RESPONSE_IN} 响应头: ` + JSON.stringify(headersObj), 'responseProcessing');
     
-    // 详细分析响应类型
-    this.log('info', `${LOG_MARKERS.CONTENT_ANALYSIS} 响应分析 - status: ${response.status}, statusText: ${response.statusText}`, 'contentAnalysis');
-    this.log('info', `${LOG_MARKERS.CONTENT_ANALYSIS} Content-Type: ${response.headers.get("Content-Type")}`, 'contentAnalysis');
-    this.log('info', `${LOG_MARKERS.CONTENT_ANALYSIS} Content-Length: ${response.headers.get("Content-Length")}`, 'contentAnalysis');
-    this.log('info', `${LOG_MARKERS.CONTENT_ANALYSIS} Transfer-Encoding: ${response.headers.get("Transfer-Encoding")}`, 'contentAnalysis');
-
     const contentType = response.headers.get("Content-Type") || "";
-    this.log('debug', `${LOG_MARKERS.CONTENT_ANALYSIS} 响应Content-Type: ${contentType}`, 'contentAnalysis');
+
+    // 详细分析响应类型，合并为一条日志，只写一次
+    this.log('info', `${LOG_MARKERS.CONTENT_ANALYSIS} 响应分析 - status: ${response.status}, statusText: ${response.statusText}, Content-Type: ${contentType}, Content-Length: ${response.headers.get("Content-Length")}, Transfer-Encoding: ${response.headers.get("Transfer-Encoding")}`, 'contentAnalysis');
     
     // 由于我们发送的是非流式请求，206状态码可能是特殊的响应格式
     // 优先尝试作为JSON响应处理
@@ -590,7 +624,6 @@ export class ZjcspaceTransformer implements Transformer {
         return response;
       }
       const decoder = new TextDecoder();
-      const encoder = new TextEncoder();
       let chunkIndex = 0;
       const transformer = this; // 保存对transformer实例的引用
       const stream = new ReadableStream({
@@ -717,7 +750,7 @@ export class ZjcspaceTransformer implements Transformer {
       this.log('debug', `${LOG_MARKERS.CONTENT_ANALYSIS} 提取message content: ${typeof messageContent} - 长度: ${typeof messageContent === 'string' ? messageContent.length : 'N/A'}`, 'contentAnalysis');
       
       if (typeof messageContent === 'string') {
-        const jsonMatch = messageContent.match(/```json\n([\s\S]*?)\n```/);
+        const jsonMatch = messageContent.match(JSON_CODE_BLOCK_PATTERN);
         if (jsonMatch && jsonMatch[1] && jsonResponse.choices?.[0]?.message) {
           this.log('info', `${LOG_MARKERS.CONTENT_ANALYSIS} 检测到JSON代码块，进行内容清洗`, 'contentAnalysis');
           jsonResponse.choices[0].message.content = jsonMatch[1];
@@ -766,7 +799,7 @@ export class ZjcspaceTransformer implements Transformer {
     this.log('debug', `${LOG_MARKERS.CONTENT_ANALYSIS} 提取message content: ${typeof messageContent} - 长度: ${typeof messageContent === 'string' ? messageContent.length : 'N/A'}`, 'contentAnalysis');
     
     if (typeof messageContent === 'string') {
-      const jsonMatch = messageContent.match(/```json\n([\s\S]*?)\n```/);
+      const jsonMatch = messageContent.match(JSON_CODE_BLOCK_PATTERN);
       if (jsonMatch && jsonMatch[1] && jsonData.choices?.[0]?.message) {
         this.log('info', `${LOG_MARKERS.CONTENT_ANALYSIS} 检测到JSON代码块，进行内容清洗`, 'contentAnalysis');
         jsonData.choices[0].message.content = jsonMatch[1];
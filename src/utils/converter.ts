@@ -79,8 +79,7 @@ export function convertToOpenAI(
     }
   });
 
-  for (let i = 0; i < request.messages.length; i++) {
-    const msg = request.messages[i];
+  for (const msg of request.messages) {
 
     if (msg.role === "tool") {
       continue;
@@ -164,15 +163,20 @@ export function convertToOpenAI(
 
 
 
-function isToolCallContent(content: string): boolean {
+// 解析以 JSON 数组形式存放的 tool_use 内容，不是工具调用时返回 null
+function parseToolCallContent(content: string): any[] | null {
+  // 只有 JSON 数组才可能是工具调用，普通文本无需进入 JSON.parse 抛异常
+  if (!content.trimStart().startsWith("[")) {
+    return null;
+  }
   try {
     const parsed = JSON.parse(content);
-    return (
-      Array.isArray(parsed) &&
+    return Array.isArray(parsed) &&
       parsed.some((item) => item.type === "tool_use" && item.id && item.name)
-    );
+      ? parsed
+      : null;
   } catch {
-    return false;
+    return null;
   }
 }
 
@@ -180,13 +184,12 @@ export function convertFromOpenAI(
   request: OpenAIChatRequest
 ): UnifiedChatRequest {
   const messages: UnifiedMessage[] = request.messages.map((msg) => {
-    if (
-      msg.role === "assistant" &&
-      typeof msg.content === "string" &&
-      isToolCallContent(msg.content)
-    ) {
+    const toolCalls =
+      msg.role === "assistant" && typeof msg.content === "string"
+        ? parseToolCallContent(msg.content)
+        : null;
+    if (toolCalls) {
       try {
-        const toolCalls = JSON.parse(msg.content);
         const convertedToolCalls = toolCalls.map((call: any) => ({
           id: call.id,
           type: "function" as const,
@@ -266,8 +269,7 @@ export function convertFromAnthropic(
   const pendingTextContent: string[] = [];
   let lastRole: string | null = null;
 
-  for (let i = 0; i < request.messages.length; i++) {
-    const msg = request.messages[i];
+  for (const msg of request.messages) {
 
     if (typeof msg.content === "string") {
       if (
@@ -1,5 +1,33 @@
 import fs from "node:fs";
 
+// One append-mode fd per log file, reopened if the path is rotated away.
+// Writes are synchronous, so lines logged right before process.exit are kept.
+interface LogFile {
+  fd: number;
+  ino: number;
+  dev: number;
+}
+
+const logFiles = new Map<string, LogFile>();
+
+function getLogFd(file: string): number {
+  const cached = logFiles.get(file);
+  if (cached) {
+    // Reopen when the path was deleted, renamed or rotated away from the open fd
+    const stat = fs.statSync(file, { throwIfNoEntry: false });
+    if (stat && stat.ino === cached.ino && stat.dev === cached.dev) {
+      return cached.fd;
+    }
+    fs.closeSync(cached.fd);
+    logFiles.delete(file);
+  }
+
+  const fd = fs.openSync(file, "a");
+  const { ino, dev } = fs.fstatSync(fd);
+  logFiles.set(file, { fd, ino, dev });
+  return fd;
+}
+
 export function log(...args: any[]) {
   console.log(...args);
   // Check if logging is enabled via environment variable
@@ -22,5 +50,5 @@ export function log(...args: any[]) {
 
   // Append to log file
   const LOG_FILE = process.env.LOG_FILE || "app.log";
-  fs.appendFileSync(LOG_FILE, logMessage, "utf8");
+  fs.writeSync(getLogFd(LOG_FILE), logMessage, null, "utf8");
 }
@@ -2,6 +2,19 @@ import { ProxyAgent } from "undici";
 import { UnifiedChatRequest } from "../types/llm";
 import { log } from "./log";
 
+// 按代理地址复用 ProxyAgent，使同一代理的请求共享连接池，而不是每个请求新建一个 agent
+const proxyAgents = new Map<string, ProxyAgent>();
+
+function getProxyAgent(httpsProxy: string): ProxyAgent {
+  const proxyUrl = new URL(httpsProxy).toString();
+  let agent = proxyAgents.get(proxyUrl);
+  if (!agent) {
+    agent = new ProxyAgent(proxyUrl);
+    proxyAgents.set(proxyUrl, agent);
+  }
+  return agent;
+}
+
 export function sendUnifiedRequest(
   url: URL | string,
   request: UnifiedChatRequest,
@@ -36,9 +49,7 @@ export function sendUnifiedRequest(
   };
 
   if (config.httpsProxy) {
-    (fetchOptions as any).dispatcher = new ProxyAgent(
-      new URL(config.httpsProxy).toString()
-    );
+    (fetchOptions as any).dispatcher = getProxyAgent(config.httpsProxy);
   }
   // 请求日志已简化
   return fetch(typeof url === "string" ? url : url.toString(), fetchOptions);
@@ -1,6 +1,19 @@
 import { UnifiedTool } from "../types/llm";
 import { log } from "./log";
 
+// 清理后仍不应出现的不兼容字段
+const INCOMPATIBLE_FIELDS = ['const', '$schema'];
+
+// 后序遍历 schema 时的栈帧：field / key 记录节点在父节点中的位置，cleaned 为清理结果
+interface SchemaFrame {
+  schema: any;
+  isProperty: boolean;
+  field?: string;
+  key?: string | number;
+  children: SchemaFrame[] | null;
+  cleaned: any;
+}
+
 /**
  * NewAPI工具清理器 - 智能替换版本
  * 不是简单删除字段，而是使用OpenAI支持的等效格式替代
@@ -21,63 +34,134 @@ export class NewAPIToolCleaner {
 
   /**
    * 清理单个工具定义
+   * 写时复制：只复制需要修改的节点及其祖先，没有不兼容字段的工具原样返回；
+   * 调用方传入的工具定义（可能与原始请求体共享对象）不会被修改
    */
   private static cleanSingleTool(tool: UnifiedTool): UnifiedTool {
-    const cleanedTool = JSON.parse(JSON.stringify(tool)); // 深拷贝
-    
-    if (cleanedTool.function?.parameters) {
-      this.cleanJsonSchema(cleanedTool.function.parameters);
+    const parameters = tool.function?.parameters;
+    if (!parameters) {
+      return tool;
+    }
+
+    const cleanedParameters = this.cleanJsonSchema(parameters);
+    if (cleanedParameters === parameters) {
+      return tool;
     }
-    
-    return cleanedTool;
+
+    return {
+      ...tool,
+      function: { ...tool.function, parameters: cleanedParameters },
+    };
   }
 
   /**
    * 智能清理JSON Schema - 使用替换而非删除策略
+   * 返回清理后的节点：没有变化时返回原节点，否则返回浅拷贝（写时复制）。
+   * 显式栈做后序遍历，避免深层嵌套的 schema 递归调用：子节点都处理完后才重建父节点
+   */
+  private static cleanJsonSchema(rootSchema: any): any {
+    const root: SchemaFrame = { schema: rootSchema, isProperty: false, children: null, cleaned: rootSchema };
+    const stack: SchemaFrame[] = [root];
+
+    while (stack.length > 0) {
+      const frame = stack[stack.length - 1];
+      const schema = frame.schema;
+
+      if (!schema || typeof schema !== 'object') {
+        stack.pop();
+        continue;
+      }
+
+      if (frame.children === null) {
+        // 首次访问：压入子节点，留在栈中等子节点处理完
+        frame.children = this.collectChildFrames(schema);
+        stack.push(...frame.children);
+        continue;
+      }
+
+      stack.pop();
+      frame.cleaned = this.rebuildSchema(frame);
+    }
+
+    return root.cleaned;
+  }
+
+  /**
+   * 列出需要清理的子节点：properties 下的属性、items（属性需处理const），以及 anyOf / allOf / oneOf
    */
-  private static cleanJsonSchema(schema: any): void {
-    if (!schema || typeof schema !== 'object') return;
+  private static collectChildFrames(schema: any): SchemaFrame[] {
+    const children: SchemaFrame[] = [];
+    const child = (value: any, isProperty: boolean, field: string, key?: string | number): SchemaFrame =>
+      ({ schema: value, isProperty, field, key, children: null, cleaned: value });
 
     // 处理properties
     if (schema.properties && typeof schema.properties === 'object') {
-      Object.keys(schema.properties).forEach(key => {
-        this.cleanSchemaProperty(schema.properties[key]);
-      });
+      for (const key of Object.keys(schema.properties)) {
+        children.push(child(schema.properties[key], true, 'properties', key));
+      }
     }
 
     // 处理数组items
     if (schema.items) {
-      this.cleanSchemaProperty(schema.items);
+      children.push(child(schema.items, true, 'items'));
     }
 
-    // 递归处理嵌套的anyOf, allOf, oneOf等
-    ['anyOf', 'allOf', 'oneOf'].forEach(key => {
-      if (Array.isArray(schema[key])) {
-        schema[key].forEach((subSchema: any) => this.cleanJsonSchema(subSchema));
+    // 处理嵌套的anyOf, allOf, oneOf等
+    for (const field of ['anyOf', 'allOf', 'oneOf']) {
+      if (Array.isArray(schema[field])) {
+        schema[field].forEach((subSchema: any, index: number) => {
+          children.push(child(subSchema, false, field, index));
+        });
       }
-    });
+    }
 
-    // 移除确认不支持的元数据字段（这些字段OpenAI确实不需要）
-    delete schema.$schema;
-    delete schema.additionalProperties; // OpenAI用strict模式处理
+    return children;
   }
 
   /**
-   * 清理单个属性，重点处理const字段
+   * 根据子节点的清理结果重建节点，只有实际发生变化时才复制
    */
-  private static cleanSchemaProperty(property: any): void {
-    if (!property || typeof property !== 'object') return;
+  private static rebuildSchema(frame: SchemaFrame): any {
+    const schema = frame.schema;
+    let cleaned = schema;
+    const writable = () => {
+      if (cleaned === schema) {
+        cleaned = Array.isArray(schema) ? [...schema] : { ...schema };
+      }
+      return cleaned;
+    };
 
     // 🚀 关键改进：将const转换为enum，保持功能完整性
-    if (property.const !== undefined) {
+    if (frame.isProperty && schema.const !== undefined) {
       // const: "value" → enum: ["value"]  
       // 这样保持了相同的约束功能，但使用OpenAI支持的格式
-      property.enum = [property.const];
-      delete property.const;
+      writable().enum = [schema.const];
+      delete cleaned.const;
+    }
+
+    // 放回有变化的子节点，所在的 properties / 数组同样先复制再修改
+    const copiedFields: Record<string, any> = {};
+    for (const child of frame.children!) {
+      if (child.cleaned === child.schema) continue;
+      if (child.field === 'items') {
+        writable().items = child.cleaned;
+        continue;
+      }
+      const field = child.field!;
+      copiedFields[field] ??= Array.isArray(schema[field]) ? [...schema[field]] : { ...schema[field] };
+      copiedFields[field][child.key!] = child.cleaned;
+    }
+    for (const field of Object.keys(copiedFields)) {
+      writable()[field] = copiedFields[field];
     }
 
-    // 递归处理嵌套属性
-    this.cleanJsonSchema(property);
+    // 移除确认不支持的元数据字段（这些字段OpenAI确实不需要）
+    if (schema.$schema !== undefined || schema.additionalProperties !== undefined) {
+      delete writable().$schema;
+      delete cleaned.additionalProperties; // OpenAI用strict模式处理
+    }
+
+    return cleaned;
   }
 
   /**
@@ -109,22 +193,26 @@ export class NewAPIToolCleaner {
   }
 
   /**
-   * 检查是否还有不兼容字段
+   * 检查是否还有不兼容字段（显式栈遍历，避免深层嵌套的 schema 递归调用）
    */
   private static hasIncompatibleFields(obj: any): boolean {
     if (!obj || typeof obj !== 'object') return false;
 
-    // 检查已知的不兼容字段
-    const incompatibleFields = ['const', '$schema'];
-    
-    for (const field of incompatibleFields) {
-      if (obj[field] !== undefined) return true;
-    }
+    const stack: any[] = [obj];
 
-    // 递归检查嵌套对象
-    for (const key in obj) {
-      if (typeof obj[key] === 'object' && obj[key] !== null) {
-        if (this.hasIncompatibleFields(obj[key])) return true;
+    while (stack.length > 0) {
+      const current = stack.pop();
+
+      for (const field of INCOMPATIBLE_FIELDS) {
+        if (current[field] !== undefined) return true;
+      }
+
+      // 嵌套对象入栈，稍后检查
+      for (const key in current) {
+        const value = current[key];
+        if (typeof value === 'object' && value !== null) {
+          stack.push(value);
+        }
       }
     }
 